@@ -1,20 +1,24 @@
 from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from os import cpu_count
 
+import orjson
 import pandas as pd
-import numpy as np
 import requests
 import json
 from tqdm import tqdm
-from re import sub
+from re import compile as re_compile
+
+_RE_NONWORD = re_compile(r'[^\w\s-]')
+_RE_SEPARATOR = re_compile(r'[\s_-]+')
+_RE_EDGE_DASHES = re_compile(r'^-+|-+$')
 
 
 def slugify(s):
-    s = s.lower().strip()
-    s = sub(r'[^\w\s-]', '', s)
-    s = sub(r'[\s_-]+', '-', s)
-    s = sub(r'^-+|-+$', '', s)
+    s = _RE_NONWORD.sub('', s.lower().strip())
+    s = _RE_SEPARATOR.sub('-', s)
 
-    return s
+    return _RE_EDGE_DASHES.sub('', s)
 
 
 file_details = [
@@ -56,134 +60,180 @@ headers = {
 }
 
 
-def process_file(file_path, input_type):
-    items = []
-    first_word = file_path.split('/')[-1].split('_')[0]
-    excel_data = pd.ExcelFile(file_path)
-    for sheet_name in excel_data.sheet_names:
-        sheet_df = pd.read_excel(file_path, sheet_name=sheet_name)
-        name_columns = [col for col in sheet_df.columns if 'name' in col.lower() and
-                        'value' not in col.lower()]
-        value_id_col = next((col for col in sheet_df.columns if
-                             'value' in col.lower() and 'id' in col.lower()), None)
-        value_name_col = next((col for col in sheet_df.columns if
-                               'value' in col.lower() and 'name' in col.lower()), None)
-        value_image_col = next((col for col in sheet_df.columns if
-                               'value' in col.lower() and 'image' in col.lower()), None)
-
-        if name_columns:
-            for name_col in name_columns:
-                # names = sheet_df[name_col].dropna().unique()
-                names = sheet_df[name_col].dropna()
-                columns = [name_col, value_id_col, value_name_col,
-                           value_image_col] if value_image_col else ([name_col,
-                                                                     value_id_col,
-                                                                     value_name_col] if (value_id_col and value_name_col) else [name_col])
-                row_generator = sheet_df[columns].iterrows()
-                skipped_first = None
-                for i, name in enumerate(names.values):
-                    was_name_marked = False
-                    external_reference = f"{first_word}-{sheet_df.iloc[names.index[i], 0]}-tdh-old"
-                    if value_id_col and value_name_col:
-                        values = []
-                        for _, row in row_generator:
-                            if skipped_first:
-                                if skipped_first[value_name_col] is not np.nan:
-                                    was_name_marked = True
-                                    external_val_reference = f"values-{skipped_first[value_id_col]}-tdh-old"
-                                    values.append(
-                                        {'externalReference': external_val_reference,
-                                         'name': skipped_first[value_name_col]}
-                                    )
-                                    if value_image_col and (skipped_first[value_image_col] is not np.nan):
-                                        values[-1]['file'] = {
-                                            'url': skipped_first[value_image_col],
-                                        }
-                                skipped_first = None
-
-                            if (row[name_col] is np.nan) or row[name_col] == name:
-                                if was_name_marked and row[name_col] == name:
-                                    skipped_first = row.to_dict()
-                                    break
-
-                                if not was_name_marked and row[name_col] == name:
-                                    was_name_marked = True
-                                if row[value_name_col] is not np.nan:
-                                    external_val_reference = f"values-{row[value_id_col]}-tdh-old"
-                                    values.append(
-                                        {'externalReference': external_val_reference,
-                                         'name': row[value_name_col]}
-                                    )
-                                    if value_image_col and (row[value_image_col] is not np.nan):
-                                        values[-1]['file'] = {
-                                            'url': row[value_image_col],
-                                        }
-                            else:
-                                skipped_first = row.to_dict()
-                                break
-                    else:
-                        values = None
-                    item = {
-                        'name': name,
-                        'externalReference': external_reference,
-                        'inputType': input_type,
-                        'slug': slugify(name) + f"-{sheet_df.iloc[names.index[i], 0]}",
-                    }
-                    if values:
-                        item['values'] = values
-
-                    items.append(item)
-
-    return items
+# One keep-alive session for all Saleor calls the script makes.
+session = requests.Session()
+session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=4))
 
+# Batches this large stay comfortably under Saleor's request size limit.
+ATTRIBUTE_BATCH_SIZE = 500
 
-def send_data_to_saleor(items):
-    mutation = """
-    mutation bulkAttributeCreate(
-    $input: [AttributeBulkCreateInput!]!
-    $errorPolicy: ErrorPolicyEnum
-    ) {
-        attributeBulkCreate(attributes: $attributes, errorPolicy: $errorPolicy) {
-            errors {
-                path
-                message
-            }
-            attribute {
-                id
+BULK_ATTRIBUTE_CREATE_MUTATION = """
+mutation bulkAttributeCreate(
+$attributes: [AttributeBulkCreateInput!]!
+$errorPolicy: ErrorPolicyEnum
+) {
+    attributeBulkCreate(attributes: $attributes, errorPolicy: $errorPolicy) {
+        errors {
+            path
+            message
+        }
+        attribute {
+            id
+            name
+            externalReference
+            slug
+            values {
                 name
-                externalReference
-                slug
-                values {
-                    name
-                }
             }
         }
     }
-    """
-    variables = {
-        "attributes": [
-            {
-                "name": item['name'],
-                "externalReference": item['externalReference'],
-                "inputType": item['inputType'],
-                # "values": item['values']
-                "values": [{"name": value['name']} for value in item['values']]
-            } if item.get('values') else {
-                "name": item['name'],
-                "externalReference": item['externalReference'],
-                "inputType": item['inputType']
+}
+"""
+
+
+def build_values(group, value_id_col, value_name_col, value_image_col):
+    """Build the Saleor `values` list for one attribute from its value rows."""
+    value_ids = group[value_id_col].to_numpy()
+    value_names = group[value_name_col].to_numpy()
+    value_images = group[value_image_col].to_numpy() if value_image_col else None
+
+    values = []
+    for j in range(len(value_ids)):
+        value = {
+            'externalReference': f"values-{value_ids[j]}-tdh-old",
+            'name': value_names[j],
+        }
+        if value_images is not None and not pd.isna(value_images[j]):
+            value['file'] = {
+                'url': value_images[j],
             }
-            for item in items
-        ],
-        "errorPolicy": "REJECT_EVERYTHING",
+        values.append(value)
+
+    return values
+
+
+def process_sheet(excel_data, sheet_name, first_word, input_type):
+    items = []
+    columns = list(excel_data.parse(sheet_name, nrows=0).columns)
+    name_columns = [col for col in columns if 'name' in col.lower() and
+                    'value' not in col.lower()]
+    value_id_col = next((col for col in columns if
+                         'value' in col.lower() and 'id' in col.lower()), None)
+    value_name_col = next((col for col in columns if
+                           'value' in col.lower() and 'name' in col.lower()), None)
+    value_image_col = next((col for col in columns if
+                           'value' in col.lower() and 'image' in col.lower()), None)
+
+    if name_columns:
+        dtype = {col: 'string' for col in name_columns}
+        if value_name_col:
+            dtype[value_name_col] = 'string'
+        if value_image_col:
+            dtype[value_image_col] = 'string'
+        # Only the columns actually consumed below are parsed; the first
+        # column is kept for the external references.
+        needed_cols = list(dict.fromkeys(
+            [columns[0], *name_columns]
+            + [col for col in (value_id_col, value_name_col, value_image_col)
+               if col]
+        ))
+        sheet_df = excel_data.parse(sheet_name, usecols=needed_cols,
+                                    dtype=dtype)
+        # One plain array per sheet; indexing it by position is much
+        # cheaper than going through iloc for every name row.
+        first_col_values = sheet_df.iloc[:, 0].to_numpy()
+        for name_col in name_columns:
+            # Rows where the name cell is filled mark the start of an
+            # attribute block; the value rows below inherit it via ffill.
+            name_mask = sheet_df[name_col].notna()
+            name_positions = name_mask.to_numpy().nonzero()[0]
+            names = sheet_df[name_col].to_numpy()[name_positions]
+
+            if value_id_col and value_name_col:
+                # Each filled name cell starts a new block; grouping the
+                # value rows by the running block id (rather than by name)
+                # keeps repeated attribute names from merging each other's
+                # values.
+                block_ids = name_mask.cumsum()
+                value_mask = sheet_df[value_name_col].notna()
+                values_by_block = {
+                    block_id: build_values(
+                        group, value_id_col, value_name_col, value_image_col
+                    )
+                    for block_id, group in sheet_df[value_mask].groupby(
+                        block_ids[value_mask], sort=False
+                    )
+                }
+            else:
+                values_by_block = {}
+
+            for block_id, (name, first_col_value) in enumerate(
+                    zip(names, first_col_values[name_positions]), start=1):
+                item = {
+                    'name': name,
+                    'externalReference': f"{first_word}-{first_col_value}-tdh-old",
+                    'inputType': input_type,
+                    'slug': slugify(name) + f"-{first_col_value}",
+                }
+                values = values_by_block.get(block_id)
+                if values:
+                    item['values'] = values
+
+                items.append(item)
+
+    return items
+
+
+def process_file(file_path, input_type):
+    first_word = file_path.split('/')[-1].split('_')[0]
+    # read_only makes openpyxl stream rows instead of building the whole
+    # workbook tree; the opened ExcelFile is reused for every sheet read.
+    excel_data = pd.ExcelFile(file_path, engine='openpyxl',
+                              engine_kwargs={'read_only': True})
+    # The real parallelism is across sheets, not across the three files.
+    with ThreadPoolExecutor(max_workers=cpu_count()) as executor:
+        sheet_items = executor.map(
+            lambda sheet_name: process_sheet(
+                excel_data, sheet_name, first_word, input_type
+            ),
+            excel_data.sheet_names,
+        )
+        return list(chain.from_iterable(sheet_items))
+
+
+def attribute_to_input(item):
+    attribute_input = {
+        "name": item['name'],
+        "externalReference": item['externalReference'],
+        "inputType": item['inputType'],
     }
-    # response = requests.post(
-    #     graphql_endpoint,
-    #     headers=headers,
-    #     json={'query': mutation, 'variables': variables}
-    # )
-    # return response.json()
-    return None
+    if item.get('values'):
+        attribute_input['values'] = [
+            {"name": value['name']} for value in item['values']
+        ]
+
+    return attribute_input
+
+
+def send_data_to_saleor(items):
+    responses = []
+    for start in range(0, len(items), ATTRIBUTE_BATCH_SIZE):
+        variables = {
+            "attributes": [
+                attribute_to_input(item)
+                for item in items[start:start + ATTRIBUTE_BATCH_SIZE]
+            ],
+            "errorPolicy": "REJECT_EVERYTHING",
+        }
+        response = session.post(
+            graphql_endpoint,
+            headers=headers,
+            json={'query': BULK_ATTRIBUTE_CREATE_MUTATION,
+                  'variables': variables}
+        )
+        responses.append(response.json())
+
+    return responses
 
 
 all_items = []
@@ -197,5 +247,5 @@ response = send_data_to_saleor(all_items)
 print(json.dumps(response, indent=4))
 
 
-with open('./fixtures/attributes.json', 'w') as f:
-    json.dump(all_items, f, indent=4)
+with open('./fixtures/attributes.json', 'wb') as f:
+    f.write(orjson.dumps(all_items, option=orjson.OPT_INDENT_2))
@@ -1,5 +1,6 @@
 import traceback
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 from ....celeryconf import app
 from ....core.db.connection import allow_writer
@@ -10,7 +11,7 @@ from ....core.db.connection import allow_writer
 def post_confirm_order(order_id):
     from saleor.order.models import Order
     from .utils.zoho_client import get_or_create_customer, get_or_create_item, \
-        create_estimate
+        create_estimate, warm_item_lookup_caches
 
     def get_line_item_attributes_and_brand(line_item):
         """
@@ -21,48 +22,50 @@ def post_confirm_order(order_id):
         :return: Tuple: (Dictionary of attribute names and values, Brand).
         """
 
-        attributes_map = {}
-
         product = line_item.variant.product
         variant = line_item.variant
         brand = None
 
-        # Extract product attributes
-        attribute_products = product.product_type.attributeproduct.all()
-        assigned_values = product.attributevalues.all()
-
+        # Extract product attributes: collect the value names per slug in
+        # one pass, then resolve each assigned attribute with dict lookups.
         values_map = defaultdict(list)
-        for av in assigned_values:
-            values_map[av.value.attribute.slug].append(av.value)
+        for av in product.attributevalues.all():
+            values_map[av.value.attribute.slug].append(av.value.name)
 
-        for attribute_product in attribute_products:
-            attribute = attribute_product.attribute
-            attr_slug = attribute.slug
-
-            attr_values = []
-            for attr_value in values_map.get(attr_slug, []):
-                value = attr_value.name
-                attr_values.append(value)
-
-            attributes_map[attr_slug] = attr_values if len(attr_values) < 1 else \
-                attr_values[0]
+        attributes_map = {}
+        for attribute_product in product.product_type.attributeproduct.all():
+            attr_slug = attribute_product.attribute.slug
+            attr_values = values_map.get(attr_slug, [])
+            attributes_map[attr_slug] = attr_values[0] if attr_values else None
 
         # Extract variant attributes
         for attr in variant.attributes.all():
             attr_name = attr.assignment.attribute.slug
-            attr_value = [value.name for value in attr.values.all()]
+            attr_values = [value.name for value in attr.values.all()]
             if attr_name == 'brand':
-                brand = attr_value if len(attr_value) > 1 else \
-                    attr_value[0]
+                brand = attr_values if len(attr_values) > 1 else \
+                    (attr_values[0] if attr_values else None)
                 continue
-            attributes_map[attr_name] = attr_value if len(attr_value) < 1 else \
-                attr_value[0]
+            attributes_map[attr_name] = attr_values[0] if attr_values else None
 
         return attributes_map, brand
 
     """Triggered when an order is confirmed in Saleor."""
     try:
-        order = Order.objects.get(id=order_id)
+        # Pull the whole attribute/listing graph in one go so the per-line
+        # .all() traversals below stay in memory instead of hitting the DB.
+        order = Order.objects.select_related(
+            "user__default_shipping_address",
+            "user__default_billing_address",
+            "channel",
+        ).prefetch_related(
+            "lines__variant__product__category",
+            "lines__variant__product__product_type__attributeproduct__attribute",
+            "lines__variant__product__attributevalues__value__attribute",
+            "lines__variant__attributes__assignment__attribute",
+            "lines__variant__attributes__values",
+            "lines__variant__channel_listings",
+        ).get(id=order_id)
         user = order.user
         customer_email = user.email
         customer_name = f"{user.first_name} {user.last_name}" if user.first_name \
@@ -78,12 +81,17 @@ def post_confirm_order(order_id):
         customer_id = customer_response["contact_id"]
         contact_id = person_response["contact_person_id"]
 
-        items = []
+        # Gather everything needed per line first (DB work stays in this
+        # thread), then fan the independent Zoho calls out to a pool.
+        line_payloads = []
         for line in order.lines.all():
             sku = line.product_sku
             name = line.product_name
             price = line.unit_price_gross_amount
-            channel_listing = line.variant.channel_listings.get(channel=order.channel)
+            channel_listing = next(
+                listing for listing in line.variant.channel_listings.all()
+                if listing.channel_id == order.channel_id
+            )
             cost = channel_listing.cost_price.amount if \
                 channel_listing.cost_price else 0.00
             # description = line.variant.product.description or \
@@ -92,11 +100,55 @@ def post_confirm_order(order_id):
             category = line.variant.product.category.name \
                 or "Default Category"
             attributes, vendor = get_line_item_attributes_and_brand(line)
-
-            item_id = get_or_create_item(
-                sku, name, price, cost, description, category, vendor, attributes
+            if isinstance(vendor, list):
+                # A multi-value brand attribute arrives as a list; Zoho
+                # takes one vendor name and the lookup caches need a
+                # hashable key.
+                vendor = ", ".join(vendor)
+
+            line_payloads.append({
+                "sku": sku,
+                "name": name,
+                "price": price,
+                "cost": cost,
+                "description": description,
+                "category": category,
+                "vendor": vendor,
+                "attributes": attributes,
+                "quantity": line.quantity,
+            })
+
+        def resolve_line(payload):
+            return get_or_create_item(
+                payload["sku"], payload["name"], payload["price"],
+                payload["cost"], payload["description"], payload["category"],
+                payload["vendor"], payload["attributes"]
             )
-            items.append({"id": item_id, "price": price, "quantity": line.quantity})
+
+        # The vendor/custom-field/dropdown get-or-create flows are not
+        # safe to race for the same key, so resolve them serially first;
+        # the fan-out then only creates items, one per unique SKU.
+        warm_item_lookup_caches(
+            vendors=[payload["vendor"] for payload in line_payloads],
+            categories=[payload["category"] for payload in line_payloads],
+        )
+        unique_payloads = {}
+        for payload in line_payloads:
+            unique_payloads.setdefault(payload["sku"], payload)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            item_ids = dict(zip(
+                unique_payloads,
+                executor.map(resolve_line, unique_payloads.values()),
+            ))
+        items = [
+            {
+                "id": item_ids[payload["sku"]],
+                "price": payload["price"],
+                "quantity": payload["quantity"],
+            }
+            for payload in line_payloads
+        ]
 
         # Create the estimate
         response = create_estimate(
@@ -114,14 +166,18 @@ def post_confirm_order(order_id):
 @allow_writer()
 def check_estimate_accepted_and_add_zoho_payments():
     from saleor.checkout.tasks.client_specifics.utils.zoho_client import \
-        get_all_accepted_estimates
+        get_all_accepted_estimates, update_retainer_invoice_payment_options
     estimates = get_all_accepted_estimates()
 
-    for estimate in estimates:
-        estimate_id = estimate["estimate_id"]
-        from saleor.checkout.tasks.client_specifics.utils.zoho_client import \
-            update_retainer_invoice_payment_options
-        update_retainer_invoice_payment_options(estimate_id)
-
     if estimates:
+        # Each update is two independent Zoho round-trips; run them
+        # concurrently over the shared connection pool.
+        with ThreadPoolExecutor(
+            max_workers=min(16, len(estimates))
+        ) as executor:
+            list(executor.map(
+                update_retainer_invoice_payment_options,
+                (estimate["estimate_id"] for estimate in estimates),
+            ))
+
         return "Retainer invoice check completed."
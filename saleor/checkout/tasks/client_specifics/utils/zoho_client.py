@@ -1,6 +1,8 @@
 import datetime
+import functools
 import logging
 import os
+import threading
 from decimal import Decimal
 
 import requests
@@ -14,10 +16,23 @@ ZOHO_REFRESH_TOKEN = os.environ.get("ZOHO_REFRESH_TOKEN", "")
 ZOHO_ORG_ID = "699140456"
 TOKEN_FILE = "/tmp/zoho_access_token.json"
 
+# In-process token cache; the file is only touched on a cold start or
+# after expiry instead of once per Zoho request.
+_token_cache = {"access_token": None, "expiry": 0}
+_token_lock = threading.Lock()
+
 
 logger = logging.getLogger(__name__)
 
 
+# Shared session so keep-alive connections to Zoho are reused across the
+# many small calls one order generates (also from worker threads).
+_session = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+
 class DecimalEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Decimal):
@@ -25,6 +40,11 @@ class DecimalEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+# One reusable encoder instance; json.dumps(..., cls=...) builds a fresh
+# encoder per call, and the compact separators shrink the request body.
+_decimal_encoder = DecimalEncoder(separators=(",", ":"))
+
+
 def filter_object(obj, keys_to_keep):
     """
     Returns a new dictionary containing only the specified keys from the original object.
@@ -45,7 +65,7 @@ def refresh_access_token():
         "client_secret": ZOHO_CLIENT_SECRET,
         "grant_type": "refresh_token"
     }
-    response = requests.post(url, data=payload).json()
+    response = _session.post(url, data=payload).json()
 
     if "access_token" in response:
         token_data = {
@@ -53,8 +73,12 @@ def refresh_access_token():
             "expiry": time.time() + response["expires_in"] - 300
             # Refresh 5 min before expiry
         }
-        with open(TOKEN_FILE, "w") as file:
+        # Write atomically so a concurrent reader never sees a partial file.
+        tmp_file = TOKEN_FILE + ".tmp"
+        with open(tmp_file, "w") as file:
             json.dump(token_data, file)
+        os.replace(tmp_file, TOKEN_FILE)
+        _token_cache.update(token_data)
         return response["access_token"]
 
     raise Exception("Failed to refresh Zoho access token")
@@ -62,15 +86,24 @@ def refresh_access_token():
 
 def get_access_token():
     """Retrieve the current access token, refreshing if necessary."""
-    try:
-        with open(TOKEN_FILE, "r") as file:
-            token_data = json.load(file)
-            if time.time() < token_data["expiry"]:
-                return token_data["access_token"]
-    except (FileNotFoundError, json.JSONDecodeError):
-        pass
+    if _token_cache["expiry"] > time.time() + 10:
+        return _token_cache["access_token"]
+
+    with _token_lock:
+        # Another thread may have refreshed while we waited for the lock.
+        if _token_cache["expiry"] > time.time() + 10:
+            return _token_cache["access_token"]
+
+        try:
+            with open(TOKEN_FILE, "r") as file:
+                token_data = json.load(file)
+                if time.time() < token_data["expiry"]:
+                    _token_cache.update(token_data)
+                    return token_data["access_token"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
 
-    return refresh_access_token()
+        return refresh_access_token()
 
 
 def get_headers():
@@ -78,13 +111,22 @@ def get_headers():
     return {"Authorization": f"Zoho-oauthtoken {get_access_token()}"}
 
 
+def _request(method, url, **kwargs):
+    """Send one Zoho API call through the shared session.
+
+    Every call gets the auth header, a default timeout and the pooled
+    connections from one place, and returns the decoded JSON body.
+    """
+    headers = {**get_headers(), **kwargs.pop("headers", {})}
+    kwargs.setdefault("timeout", 30)
+    return _session.request(method, url, headers=headers, **kwargs).json()
+
+
 def get_or_create_vendor(vendor_name):
     """Find or create a vendor in Zoho Books."""
-    headers = get_headers()
-
     search_url = f"https://www.zohoapis.com/books/v3/" \
                  f"contacts?organization_id={ZOHO_ORG_ID}&contact_type=vendor"
-    response = requests.get(search_url, headers=headers).json()
+    response = _request("GET", search_url)
     existing_vendor = next(
         (v for v in response.get("contacts", []) if v["contact_name"] == vendor_name),
         None
@@ -98,18 +140,22 @@ def get_or_create_vendor(vendor_name):
         "contact_name": vendor_name,
         "contact_type": "vendor"
     }
-    response = requests.post(create_url, json=payload, headers=headers).json()
+    response = _request("POST", create_url, json=payload)
 
     return response["contact"]["contact_id"]
 
 
+@functools.lru_cache(maxsize=256)
+def _cached_vendor_id(vendor_name):
+    """Resolve a vendor ID once per process instead of re-listing all vendors."""
+    return get_or_create_vendor(vendor_name)
+
+
 def get_or_create_category(category_name):
     """Find or create a category in Zoho Books."""
-    headers = get_headers()
-
     search_url = f"https://www.zohoapis.com/books/v3/" \
                  f"settings/categories?organization_id={ZOHO_ORG_ID}"
-    response = requests.get(search_url, headers=headers).json()
+    response = _request("GET", search_url)
 
     existing_category = next(
         (
@@ -124,27 +170,51 @@ def get_or_create_category(category_name):
     create_url = f"https://www.zohoapis.com/books/v3/" \
                  f"settings/categories?organization_id={ZOHO_ORG_ID}"
     payload = {"category_name": category_name}
-    response = requests.post(create_url, json=payload, headers=headers).json()
+    response = _request("POST", create_url, json=payload)
     return response["category"]["category_id"]
 
 
-def get_custom_field_id(field_label, module="contact"):
-    """Fetch the custom field ID by its label."""
-    headers = get_headers()
+@functools.lru_cache(maxsize=16)
+def list_custom_fields(module="contact"):
+    """List all custom fields of a module once, mapped by label."""
     url = f"https://www.zohoapis.com/books/v3/settings/" \
           f"customfields?organization_id={ZOHO_ORG_ID}&module={module}"
-    response = requests.get(url, headers=headers).json()
+    response = _request("GET", url)
+
+    # A 401/429/5xx body carries no "customfields" key; raising here keeps
+    # lru_cache from pinning the bad response for the worker's lifetime.
+    if "customfields" not in response:
+        raise Exception(
+            f"Failed to list {module} custom fields: {response}"
+        )
+
+    return {
+        field["label"]: field["customfield_id"]
+        for field in response["customfields"].get(module, [])
+    }
+
 
-    for field in response.get("customfields", {}).get(module):
-        if field["label"] == field_label:
-            return field["customfield_id"]
+# Resolved (label, module) pairs. A plain dict instead of lru_cache so a
+# failed creation (None) is never stored and the next call retries it.
+_custom_field_ids = {}
 
-    return create_custom_field(field_label, module)
+
+def _cached_custom_field_id(field_label, module="contact"):
+    """Resolve a custom field ID once per (label, module) per process."""
+    key = (field_label, module)
+    if key in _custom_field_ids:
+        return _custom_field_ids[key]
+
+    field_id = list_custom_fields(module).get(field_label)
+    if not field_id:
+        field_id = create_custom_field(field_label, module)
+    if field_id:
+        _custom_field_ids[key] = field_id
+    return field_id
 
 
 def create_custom_field(field_label, module="contact"):
     """Create a custom field if it doesn't exist."""
-    headers = get_headers()
     url = f"https://www.zohoapis.com/books/v3/settings/" \
           f"customfields?organization_id={ZOHO_ORG_ID}"
     payload = {
@@ -153,11 +223,62 @@ def create_custom_field(field_label, module="contact"):
         "data_type": "string",
         "is_active": True
     }
-    response = requests.post(url, json=payload, headers=headers).json()
+    response = _request("POST", url, json=payload)
 
     return response.get("customfield", {}).get("customfield_id")
 
 
+# Recently resolved (contact, contact person) pairs per email; repeat
+# orders from the same customer skip both lookup round-trips.
+_CUSTOMER_CACHE_TTL = 300
+_CUSTOMER_CACHE_MAX_SIZE = 512
+_customer_cache = {}
+
+
+def _cache_customer(email, fingerprint, contact_pair):
+    """Store a resolved contact pair, keeping the cache bounded.
+
+    Long-lived workers see an unbounded stream of unique emails, so
+    expired entries are dropped on every insert and the oldest entry is
+    evicted once the size cap is reached.
+    """
+    now = time.time()
+    expired = [
+        key for key, (cached_at, _, _) in _customer_cache.items()
+        if now - cached_at >= _CUSTOMER_CACHE_TTL
+    ]
+    for key in expired:
+        del _customer_cache[key]
+    while len(_customer_cache) >= _CUSTOMER_CACHE_MAX_SIZE:
+        del _customer_cache[next(iter(_customer_cache))]
+    _customer_cache[email] = (now, fingerprint, contact_pair)
+
+
+def _address_block(address, attention):
+    """Zoho address payload, shared by the billing and shipping blocks."""
+    return {
+        "attention": attention,
+        "country": "U.S.A.",
+        "city": address.city,
+        "state": address.country_area,
+        "address": address.street_address_1,
+        "street2": address.street_address_2,
+        "state_code": address.country_area,
+        "zip": address.postal_code,
+    }
+
+
+def _address_fingerprint(address):
+    """Hashable snapshot of an address, used to invalidate cached contacts."""
+    return (
+        address.city,
+        address.country_area,
+        address.street_address_1,
+        address.street_address_2,
+        address.postal_code,
+    )
+
+
 def get_or_create_customer(
     email,
     name,
@@ -167,22 +288,36 @@ def get_or_create_customer(
     shipping_address,
 ):
     """Find or create a customer in Zoho Books, ensuring custom fields exist."""
-    headers = get_headers()
+    fingerprint = (
+        _address_fingerprint(billing_address),
+        _address_fingerprint(shipping_address),
+    )
+    cached = _customer_cache.get(email)
+    if cached:
+        cached_at, cached_fingerprint, contact_pair = cached
+        if (time.time() - cached_at < _CUSTOMER_CACHE_TTL
+                and cached_fingerprint == fingerprint):
+            return contact_pair
+
     ein_or_license = metadata.get("EIN / License Number / Reseller's Permit", "")
-    field_id = get_custom_field_id(
+    field_id = _cached_custom_field_id(
         "EIN / License Number / Reseller's Permit",
     )
 
     search_url = f"https://www.zohoapis.com/books/v3/" \
                  f"contacts?organization_id={ZOHO_ORG_ID}&email={email}"
-    response = requests.get(search_url, headers=headers).json()
+    response = _request("GET", search_url)
 
     if response.get("contacts"):
         person_url = f"https://www.zohoapis.com/books/v3/" \
                      f"contacts/{response['contacts'][0]['contact_id']}/" \
                      f"contactpersons?organization_id={ZOHO_ORG_ID}"
-        second_response = requests.get(person_url, headers=headers).json()
-        return response["contacts"][0], second_response["contact_persons"][0]
+        second_response = _request("GET", person_url)
+        contact_pair = (
+            response["contacts"][0], second_response["contact_persons"][0]
+        )
+        _cache_customer(email, fingerprint, contact_pair)
+        return contact_pair
 
     create_url = f"https://www.zohoapis.com/books/v3/" \
                  f"contacts?organization_id={ZOHO_ORG_ID}"
@@ -192,55 +327,36 @@ def get_or_create_customer(
         "contact_type": 'customer',
         # "currency_id": 460000000000097,
         "customer_sub_type": "business",
-        "billing_address": {
-            "attention": name,
-            "country": "U.S.A.",
-            "city": billing_address.city,
-            "state": billing_address.country_area,
-            "address": billing_address.street_address_1,
-            "street2": billing_address.street_address_2,
-            "state_code": billing_address.country_area,
-            "zip": billing_address.postal_code,
-        },
-        "shipping_address": {
-            "attention": name,
-            "country": "U.S.A.",
-            "city": shipping_address.city,
-            "state": shipping_address.country_area,
-            "address": shipping_address.street_address_1,
-            "street2": shipping_address.street_address_2,
-            "state_code": shipping_address.country_area,
-            "zip": shipping_address.postal_code,
-        },
+        "billing_address": _address_block(billing_address, name),
+        "shipping_address": _address_block(shipping_address, name),
         "custom_fields": [{"customfield_id": field_id, "value": ein_or_license}]
     }
-    response = requests.post(create_url, json=payload, headers=headers).json()
+    response = _request("POST", create_url, json=payload)
     contact = response["contact"]
 
     create_person_url = f"https://www.zohoapis.com/books/v3/" \
                         f"contacts/contactpersons?organization_id={ZOHO_ORG_ID}"
-    name_parts = name.split(' ')
-    if len(name_parts) > 1:
-        first_name = name_parts[0]
-        last_name = " ".join(name_parts[1:])
-    else:
-        name.split('.')
-        if len(name_parts) > 1:
-            first_name = name_parts[0]
-            last_name = " ".join(name_parts[1:])
-        else:
-            last_name = name
-            first_name = ''
+    first_name, _, last_name = name.partition(' ')
+    if not last_name:
+        first_name, _, last_name = name.partition('.')
+    if not last_name:
+        first_name, last_name = '', name
     payload = {
         "contact_id": contact['contact_id'],
         "first_name": first_name,
         "last_name": last_name,
         "email": email,
     }
-    second_response = requests\
-        .post(create_person_url, json=payload, headers=headers).json()
+    second_response = _request("POST", create_person_url, json=payload)
+
+    contact_pair = (contact, second_response["contact_person"])
+    _cache_customer(email, fingerprint, contact_pair)
+
+    return contact_pair
 
-    return contact, second_response["contact_person"]
+
+# Dropdown options already confirmed to exist in Zoho, per (label, module).
+_known_dropdown_options = {}
 
 
 def get_or_create_dropdown_custom_field(field_label, module, new_option):
@@ -248,19 +364,23 @@ def get_or_create_dropdown_custom_field(field_label, module, new_option):
     Ensures a dropdown custom field exists in Zoho Books and adds a new option only
     if it's not already present.
     """
-    headers = get_headers()
-    custom_field_id = get_custom_field_id(field_label, module)
+    known_options = _known_dropdown_options.setdefault((field_label, module), set())
+    if new_option in known_options:
+        return {"message": f"'{new_option}' already exists in '{field_label}'."}
+
+    custom_field_id = _cached_custom_field_id(field_label, module)
 
     if custom_field_id:
         # Fetch existing options
         url = f"https://www.zohoapis.com/books/v3/settings/fields/editpage?" \
               f"organization_id={ZOHO_ORG_ID}&entity={module}&" \
               f"field_id={custom_field_id}"
-        response = requests.get(url, headers=headers).json()
+        response = _request("GET", url)
 
         field = response.get("field", {})
         existing_options = field.get('values', [])
-        existing_option_names = [item['name'] for item in existing_options]
+        existing_option_names = {item['name'] for item in existing_options}
+        known_options.update(existing_option_names)
 
         if new_option in existing_option_names:
             return {"message": f"'{new_option}' already exists in '{field_label}'."}
@@ -291,32 +411,64 @@ def get_or_create_dropdown_custom_field(field_label, module, new_option):
             "field_preferences",
             "show_on_pdf",
         ]
-        clean_field = filter_object(field, keys_to_keep=put_keys)
+        # Prune the fetched field in place instead of copying it into a
+        # fresh dict via filter_object.
+        for key in list(field.keys() - put_keys):
+            field.pop(key, None)
 
-        response = requests.put(put_url, json=clean_field, headers=headers).json()
+        response = _request("PUT", put_url, json=field)
+        known_options.add(new_option)
 
         return response
     return None
 
 
+def warm_item_lookup_caches(vendors, categories):
+    """Resolve the lookups shared by concurrent item creation, serially.
+
+    The underlying get-or-create calls are not safe to run concurrently
+    for the same key: two threads that both miss a cache each list then
+    POST, creating duplicate vendors, and concurrent dropdown PUTs send
+    the full option list so one thread's new option can overwrite the
+    other's. Fan-outs call this first so the per-item work only hits
+    warm caches.
+    """
+    for label in ("Category", "Item Number", "Vendor"):
+        _cached_custom_field_id(label, "item")
+    for vendor in {v for v in vendors if isinstance(v, str)}:
+        _cached_vendor_id(vendor)
+        get_or_create_dropdown_custom_field("Vendor", "item", vendor)
+    for category in {c for c in categories if isinstance(c, str)}:
+        get_or_create_dropdown_custom_field("Category", "item", category)
+
+
+# Items already resolved by SKU for the life of the worker; advisory
+# only - a stale entry just means Zoho rejects the duplicate POST and the
+# next lookup repopulates it.
+_sku_to_item = {}
+
+
 def get_or_create_item(sku, name, price, cost, description, category, vendor,
                        attributes):
     """Find or create an item in Zoho Books, ensuring custom fields exist."""
-    headers = get_headers()
+    if sku in _sku_to_item:
+        return _sku_to_item[sku]
+
     search_url = f"https://www.zohoapis.com/books/v3/" \
                  f"items?organization_id={ZOHO_ORG_ID}&search_text={sku}"
-    response = requests.get(search_url, headers=headers).json()
+    response = _request("GET", search_url)
 
     if response.get("items"):
-        return response["items"][0]["item_id"]
-
-    vendor_id = get_or_create_vendor(vendor) if vendor else None
-    full_description = ''
+        item_id = response["items"][0]["item_id"]
+        _sku_to_item[sku] = item_id
+        return item_id
 
-    for label, value in attributes.items():
-        full_description += f"{label}: {value}\n"
-
-    full_description += (description or '')
+    vendor_id = _cached_vendor_id(vendor) if vendor else None
+    full_description = ''.join(
+        f"{label}: {value}\n" for label, value in attributes.items()
+    )
+    if description:
+        full_description += description
 
     custom_fields = []
     for label, value in {
@@ -324,7 +476,7 @@ def get_or_create_item(sku, name, price, cost, description, category, vendor,
         "Item Number": sku,
         "Vendor": vendor,
     }.items():
-        field_id = get_custom_field_id(label, "item")
+        field_id = _cached_custom_field_id(label, "item")
         custom_fields.append({"customfield_id": field_id, "value": value})
         if label in ["Category", "Vendor"]:
             get_or_create_dropdown_custom_field(label, 'item', value)
@@ -344,18 +496,23 @@ def get_or_create_item(sku, name, price, cost, description, category, vendor,
     if vendor_id:
         payload["vendor_id"] = vendor_id
 
-    payload_json = json.dumps(payload, cls=DecimalEncoder)
-    response = requests.post(create_url, data=payload_json, headers=headers).json()
+    payload_json = _decimal_encoder.encode(payload)
+    response = _request(
+        "POST", create_url, data=payload_json,
+        headers={"Content-Type": "application/json"},
+    )
+
+    item_id = response["item"]["item_id"]
+    _sku_to_item[sku] = item_id
 
-    return response["item"]["item_id"]
+    return item_id
 
 
 def get_all_accepted_estimates():
     """Fetch all accepted estimates from Zoho Books."""
     url = f"https://www.zohoapis.com/books/v3/estimates?" \
           f"organization_id={ZOHO_ORG_ID}&status=accepted"
-    headers = get_headers()
-    response = requests.get(url, headers=headers).json()
+    response = _request("GET", url)
     return response.get("estimates", [])
 
 
@@ -363,12 +520,10 @@ def update_retainer_invoice_payment_options(estimate_id):
     """
     Finds the retainer invoice linked to an estimate and updates its payment options.
     """
-    headers = get_headers()
-
     # Step 1: Get Retainer Invoice(s) linked to the Estimate
     search_url = f"https://www.zohoapis.com/books/v3/retainerinvoices?" \
                  f"organization_id={ZOHO_ORG_ID}&estimate_id={estimate_id}"
-    response = requests.get(search_url, headers=headers).json()
+    response = _request("GET", search_url)
 
     retainer_invoices = response.get("retainerinvoices", [])
 
@@ -406,8 +561,7 @@ def update_retainer_invoice_payment_options(estimate_id):
         }
         clean_invoice = filter_object(retainer_invoice, keys_to_keep=put_keys)
 
-        update_response = requests.put(update_url, json=clean_invoice,
-                                       headers=headers).json()
+        update_response = _request("PUT", update_url, json=clean_invoice)
 
         return update_response
 
@@ -424,7 +578,6 @@ WARRANTY BY BRAND for all of our products can be found on the bottom of our land
 ):
     """Create an estimate in Zoho Books with additional fields, ensuring custom
     fields exist."""
-    headers = get_headers()
     create_url = f"https://www.zohoapis.com/books/v3/estimates?" \
                  f"organization_id={ZOHO_ORG_ID}&" \
                  f"send={'true' if send_email else 'false'}"
@@ -445,7 +598,7 @@ WARRANTY BY BRAND for all of our products can be found on the bottom of our land
         "Client PO": "TBA",
         "EST Lead Time": "TBA",
     }.items():
-        field_id = get_custom_field_id(label, "estimate")
+        field_id = _cached_custom_field_id(label, "estimate")
         custom_fields.append({"customfield_id": field_id, "value": value})
 
     payload = {
@@ -469,7 +622,10 @@ WARRANTY BY BRAND for all of our products can be found on the bottom of our land
     if crm_potential_id:
         payload["potential_id"] = crm_potential_id
 
-    payload_json = json.dumps(payload, cls=DecimalEncoder)
-    response = requests.post(create_url, data=payload_json, headers=headers).json()
+    payload_json = _decimal_encoder.encode(payload)
+    response = _request(
+        "POST", create_url, data=payload_json,
+        headers={"Content-Type": "application/json"},
+    )
 
     return response
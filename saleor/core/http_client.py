@@ -12,3 +12,9 @@ HTTPConfig = requests_hardened.Config(
 )
 
 HTTPClient = requests_hardened.Manager(HTTPConfig)
+
+# Long-lived hardened session for hot paths that make many small requests
+# to the same hosts (e.g. product media fetched from one CDN); keep-alive
+# amortizes the TLS handshake HTTPClient.send_request pays on every call,
+# while the IP filtering and redirect policy stay in effect.
+SharedHTTPSession = HTTPClient.get_session()
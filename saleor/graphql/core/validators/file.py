@@ -4,7 +4,7 @@ import os
 from django.core.exceptions import ValidationError
 from PIL import Image, UnidentifiedImageError
 
-from ....core.http_client import HTTPClient
+from ....core.http_client import SharedHTTPSession
 from ....thumbnail import MIME_TYPE_TO_PIL_IDENTIFIER
 from ....thumbnail.utils import ProcessedImage
 from ..utils import add_hash_to_file_name
@@ -32,20 +32,29 @@ def is_image_url(url: str) -> bool:
     return filetype is not None and is_image_mimetype(filetype)
 
 
-def validate_image_url(url: str, field_name: str, error_code: str) -> None:
-    """Check if remote file has content type of image.
+def validate_image_response(response, field_name: str, error_code: str) -> None:
+    """Check that an open HTTP response carries an image content type.
 
-    Instead of the whole file, only the headers are fetched.
+    Closes the response before raising so a streamed body is aborted
+    instead of downloaded.
     """
-    head = HTTPClient.send_request("HEAD", url, allow_redirects=False)
-    header = head.headers
-    content_type = header.get("content-type")
+    content_type = response.headers.get("content-type")
     if content_type is None or not is_supported_image_mimetype(content_type):
+        response.close()
         raise ValidationError(
             {field_name: ValidationError("Invalid file type.", code=error_code)}
         )
 
 
+def validate_image_url(url: str, field_name: str, error_code: str) -> None:
+    """Check if remote file has content type of image.
+
+    Instead of the whole file, only the headers are fetched.
+    """
+    head = SharedHTTPSession.request("HEAD", url, allow_redirects=False)
+    validate_image_response(head, field_name, error_code)
+
+
 def clean_image_file(cleaned_input, img_field_name, error_class):
     """Extract and clean uploaded image file.
 
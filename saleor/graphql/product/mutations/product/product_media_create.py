@@ -1,14 +1,17 @@
-import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 import graphene
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.files import File
-from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.db import transaction
 
-from .....core.http_client import HTTPClient
+from .....core.http_client import SharedHTTPSession
+from .....core.tracing import traced_atomic_transaction
 from .....core.utils.validators import get_oembed_data
 from .....permission.enums import ProductPermissions
 from .....product import ProductMediaTypes, models
@@ -19,10 +22,23 @@ from ....core import ResolveInfo
 from ....core.doc_category import DOC_CATEGORY_PRODUCTS
 from ....core.mutations import BaseMutation
 from ....core.types import BaseInputObjectType, ProductError, Upload
-from ....core.validators.file import clean_image_file, is_image_url, validate_image_url
+from ....core.validators.file import (
+    clean_image_file,
+    is_image_url,
+    validate_image_response,
+)
 from ....plugins.dataloaders import get_plugin_manager_promise
 from ...types import Product, ProductMedia, ProductVariant
-from ...utils import ALT_CHAR_LIMIT, download_files
+from ...utils import ALT_CHAR_LIMIT, MEDIA_MAX_BYTES
+
+# Bounds the row count per INSERT so large media_urls batches neither
+# exceed Postgres' bound-parameter limit nor spike worker memory.
+BULK_CREATE_BATCH_SIZE = getattr(
+    settings, "PRODUCT_MEDIA_BULK_CREATE_BATCH_SIZE", 500
+)
+# Hard cap on the media_urls list so the download/insert fan-out below is
+# never entered for absurdly large requests.
+MEDIA_URLS_LIMIT = getattr(settings, "PRODUCT_MEDIA_URLS_PER_MUTATION", 100)
 
 
 class BaseURLMediaObjectInput(BaseInputObjectType):
@@ -62,6 +78,10 @@ class ProductMediaCreate(BaseMutation):
     product = graphene.Field(Product)
     variant = graphene.Field(ProductVariant)
     media = graphene.Field(ProductMedia)
+    media_list = graphene.List(
+        ProductMedia,
+        description="All media created when multiple URLs were given.",
+    )
 
     class Arguments:
         input = ProductMediaCreateInput(
@@ -107,6 +127,16 @@ class ProductMediaCreate(BaseMutation):
                 }
             )
 
+        if media_urls and len(media_urls) > MEDIA_URLS_LIMIT:
+            raise ValidationError(
+                {
+                    "media_urls": ValidationError(
+                        f"Too many URLs; limit is {MEDIA_URLS_LIMIT}.",
+                        code=ProductErrorCode.INVALID.value,
+                    )
+                }
+            )
+
         if alt and len(alt) > ALT_CHAR_LIMIT:
             raise ValidationError(
                 {
@@ -123,101 +153,286 @@ class ProductMediaCreate(BaseMutation):
         cls, _root, info: ResolveInfo, /, *, input
     ):
         cls.validate_input(input)
-        product = cls.get_node_or_error(
+
+        # Fail a bad product ID before any network or storage work below;
+        # this unlocked fetch only proves existence, the inserts run
+        # against the locked re-fetch inside the transaction.
+        cls.get_node_or_error(
             info,
             input["product"],
             field="product",
             only_type=Product,
-            qs=models.Product.objects.all(),
+            qs=models.Product.objects.only("pk"),
         )
 
         alt = input.get("alt", "")
         media_url = input.get("media_url")
         media_urls = input.get("media_urls")
         variant_id = input.get("variant")
+        collapsed_single_url = False
+        if (
+            media_urls
+            and len(media_urls) == 1
+            and not media_url
+            and not variant_id
+            and is_image_url(media_urls[0]["url"])
+        ):
+            # A one-element list is a common client spelling of media_url;
+            # collapse it onto the synchronous single-URL path below and
+            # skip the event-loop, thread-pool and bulk-insert machinery.
+            # Kept off when a variant is given (only the batch path
+            # assigns VariantMedia) and for non-image URLs, which the
+            # batch path's HEAD filter would skip rather than turn into
+            # external media.
+            media_url = media_urls[0]["url"]
+            alt = media_urls[0].get("alt") or alt
+            media_urls = None
+            collapsed_single_url = True
         media = None
         variant = None
-        if img_data := input.get("image"):
-            input["image"] = info.context.FILES.get(img_data)
-            image_data = clean_image_file(input, "image", ProductErrorCode)
-            media = product.media.create(
-                image=image_data, alt=alt, type=ProductMediaTypes.IMAGE
-            )
+        downloaded_files = []
         if media_urls:
-            # Step 1: Download all files concurrently
-            downloaded_files = asyncio.run(
-                download_files(
-                    [item['url'] for item in media_urls]
+            # Resolve the variant up front so a bad ID fails before any
+            # download work and the inserts can use the raw FK id.
+            if variant_id:
+                variant = cls.get_node_or_error(
+                    info,
+                    variant_id,
+                    field="variant",
+                    only_type=ProductVariant,
+                    qs=models.ProductVariant.objects.all(),
                 )
+
+            # Imported here so only the media_urls path pulls in the
+            # async download machinery.
+            from ...utils import run_download_files
+
+            # Step 1: Download all files concurrently on the shared loop
+            # before any row lock is taken; the payloads are streamed to
+            # temp files, not held in RAM
+            downloaded_files = run_download_files(
+                [item['url'] for item in media_urls]
             )
 
-            with transaction.atomic():
-                # Step 2: Prepare MediaFile objects
-                media_objects = [
-                    models.ProductMedia(
-                        product=product,
-                        image=ContentFile(
-                            content,
-                            name=get_filename_from_url(media_url),
-                        ),
-                        alt=media_urls[i].get('alt'),
-                        type=ProductMediaTypes.IMAGE
+        created_media = []
+        stored_files = []
+        single_stored_name = None
+        oembed_data = None
+        media_type = None
+        if not media_urls and media_url:
+            # Fetch the remote payload — image bytes into storage, or the
+            # oembed metadata — before the row lock below is taken, so the
+            # transaction only covers the insert.
+            if is_image_url(media_url):
+                filename = get_filename_from_url(media_url)
+                try:
+                    # One streaming GET serves both the content-type check
+                    # and the download; the response is closed unread on
+                    # failure.
+                    image_data = SharedHTTPSession.request(
+                        "GET", media_url, stream=True, allow_redirects=False
                     )
-                    for i, (content, media_url) in enumerate(downloaded_files)
-                    if content
+                    validate_image_response(
+                        image_data,
+                        "media_url",
+                        ProductErrorCode.INVALID.value,
+                    )
+                    # The body is spooled locally under the same size cap
+                    # the batch downloads enforce, so oversized payloads
+                    # are dropped before any storage write. 1 MB chunks
+                    # keep the copy off Django's 64 KB default.
+                    with tempfile.TemporaryFile() as spooled:
+                        bytes_written = 0
+                        for chunk in image_data.iter_content(1024 * 1024):
+                            bytes_written += len(chunk)
+                            if bytes_written > MEDIA_MAX_BYTES:
+                                image_data.close()
+                                raise ValidationError(
+                                    {
+                                        "media_url": ValidationError(
+                                            "File exceeds the limit of "
+                                            f"{MEDIA_MAX_BYTES} bytes.",
+                                            code=(
+                                                ProductErrorCode.INVALID.value
+                                            ),
+                                        )
+                                    }
+                                )
+                            spooled.write(chunk)
+                        spooled.seek(0)
+                        single_stored_name = default_storage.save(
+                            f"products/{filename}", File(spooled, filename)
+                        )
+                except ValidationError:
+                    if not collapsed_single_url:
+                        raise
+                    # A collapsed one-element mediaUrls input keeps the
+                    # batch path's semantics: a URL that fails the image
+                    # checks is skipped, not turned into an error.
+            else:
+                oembed_data, media_type = get_oembed_data(
+                    media_url, "media_url"
+                )
+
+        try:
+            if media_urls:
+                # Step 2: Push the downloaded files to storage in parallel
+                # and keep only the stored names; remote PUT latency
+                # overlaps across the workers and is paid before the
+                # product row lock below is taken.
+                def _store_file(pair):
+                    tmp_path, file_url = pair
+                    with open(tmp_path, "rb") as tmp_file:
+                        return default_storage.save(
+                            f"products/{get_filename_from_url(file_url)}",
+                            File(tmp_file),
+                        )
+
+                to_store = [
+                    (i, pair)
+                    for i, pair in enumerate(downloaded_files)
+                    if pair[0]
                 ]
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    stored_names = executor.map(
+                        _store_file, [pair for _, pair in to_store]
+                    )
+                    stored_files = [
+                        (stored_name, media_urls[i].get('alt'))
+                        for (i, _), stored_name in zip(to_store, stored_names)
+                    ]
+
+            with traced_atomic_transaction():
+                # Lock the product row once up front; the FK checks of the
+                # media inserts below reuse that lock instead of each row
+                # acquiring its own shared lock on the product.
+                product = cls.get_node_or_error(
+                    info,
+                    input["product"],
+                    field="product",
+                    only_type=Product,
+                    qs=models.Product.objects.select_for_update(of=("self",)),
+                )
 
-                # Step 3: Bulk insert into DB
-                models.ProductMedia.objects.bulk_create(media_objects)
-
-                # Step 4: (Optionally) assign to a product variant
-                if variant_id:
-                    variant = cls.get_node_or_error(
-                        info,
-                        variant_id,
-                        field="variant",
-                        only_type=ProductVariant,
-                        qs=models.ProductVariant.objects.all(),
+                if img_data := input.get("image"):
+                    # Hand the resolved upload straight to the validator
+                    # instead of writing it back into the caller's input
+                    # dict.
+                    image_data = clean_image_file(
+                        {"image": info.context.FILES.get(img_data)},
+                        "image",
+                        ProductErrorCode,
                     )
-                    variant_media_mobjects = [
-                        models.VariantMedia(
-                            variant=variant,
-                            media=media_object
+                    media = product.media.create(
+                        image=image_data, alt=alt, type=ProductMediaTypes.IMAGE
+                    )
+                if media_urls:
+                    # Step 3: Build the rows from the stored names; plain
+                    # strings mean bulk_create below writes the table
+                    # without touching storage again.
+                    media_objects = [
+                        models.ProductMedia(
+                            product=product,
+                            image=stored_name,
+                            alt=item_alt,
+                            type=ProductMediaTypes.IMAGE
                         )
-                        for media_object in media_objects
+                        for stored_name, item_alt in stored_files
                     ]
 
-                    models.VariantMedia.objects.bulk_create(variant_media_mobjects)
+                    # Step 4: Bulk insert into DB; the returned instances
+                    # have their PKs populated for the variant assignment
+                    # below. bulk_create is deliberate here — a raw COPY
+                    # would skip FileField.pre_save, so the image bytes
+                    # would never reach storage, and the metadata/sort
+                    # columns inherited from ModelWithMetadata and
+                    # SortableModel would be left unset.
+                    created_media = models.ProductMedia.objects.bulk_create(
+                        media_objects, batch_size=BULK_CREATE_BATCH_SIZE
+                    )
+
+                    # Step 5: (Optionally) assign to a product variant,
+                    # using the PKs Postgres back-filled on bulk_create so
+                    # no FK descriptor work or extra fetch is needed.
+                    if variant:
+                        variant_media_mobjects = [
+                            models.VariantMedia(
+                                variant_id=variant.pk,
+                                media_id=media_object.pk,
+                            )
+                            for media_object in created_media
+                        ]
+
+                        models.VariantMedia.objects.bulk_create(
+                            variant_media_mobjects,
+                            batch_size=BULK_CREATE_BATCH_SIZE,
+                        )
+
+                    # Surface the last created media in the single `media`
+                    # field instead of leaving it None on the batch path.
+                    media = created_media[-1] if created_media else None
+
+                elif media_url:
+                    # Remote URLs can point to the images or oembed data;
+                    # both were fetched before the transaction, so only
+                    # the insert runs under the lock.
+                    if single_stored_name is not None:
+                        media = product.media.create(
+                            image=single_stored_name,
+                            alt=alt,
+                            type=ProductMediaTypes.IMAGE,
+                        )
+                    elif oembed_data is not None:
+                        # Nothing was fetched when a collapsed single URL
+                        # failed the image checks above; the mutation then
+                        # succeeds with no media, like the batch path.
+                        media = product.media.create(
+                            external_url=oembed_data["url"],
+                            alt=oembed_data.get("title", alt),
+                            type=media_type,
+                            oembed_data=oembed_data,
+                        )
+                    if collapsed_single_url and media is not None:
+                        # A collapsed one-element mediaUrls input answers
+                        # the mediaList field like the batch path would.
+                        created_media = [media]
+
+                manager = get_plugin_manager_promise(info.context).get()
+                # Dispatch the events only once the transaction commits, so
+                # plugin/webhook I/O never runs while this worker still
+                # holds the product row lock. The values are bound as
+                # defaults because `product` and `media` are rebound below;
+                # every created media gets its own event and None is never
+                # dispatched.
+                event_media = created_media if created_media else [media]
+
+                def _dispatch_events(product=product, event_media=event_media):
+                    cls.call_event(manager.product_updated, product)
+                    for event_medium in event_media:
+                        if event_medium is not None:
+                            cls.call_event(
+                                manager.product_media_created, event_medium
+                            )
+
+                transaction.on_commit(_dispatch_events)
+        except Exception:
+            # The rows never landed; drop the files stored above or they
+            # stay orphaned in the bucket.
+            for stored_name, _ in stored_files:
+                default_storage.delete(stored_name)
+            if single_stored_name is not None:
+                default_storage.delete(single_stored_name)
+            raise
+        finally:
+            for tmp_path, _ in downloaded_files:
+                if tmp_path and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
 
-        elif media_url:
-            # Remote URLs can point to the images or oembed data.
-            # In case of images, file is downloaded. Otherwise we keep only
-            # URL to remote media.
-            if is_image_url(media_url):
-                validate_image_url(
-                    media_url, "media_url", ProductErrorCode.INVALID.value
-                )
-                filename = get_filename_from_url(media_url)
-                image_data = HTTPClient.send_request(
-                    "GET", media_url, stream=True, allow_redirects=False
-                )
-                image_file = File(image_data.raw, filename)
-                media = product.media.create(
-                    image=image_file,
-                    alt=alt,
-                    type=ProductMediaTypes.IMAGE,
-                )
-            else:
-                oembed_data, media_type = get_oembed_data(media_url, "media_url")
-                media = product.media.create(
-                    external_url=oembed_data["url"],
-                    alt=oembed_data.get("title", alt),
-                    type=media_type,
-                    oembed_data=oembed_data,
-                )
-        manager = get_plugin_manager_promise(info.context).get()
-        cls.call_event(manager.product_updated, product)
-        cls.call_event(manager.product_media_created, media)
         product = ChannelContext(node=product, channel_slug=None)
         variant = ChannelContext(node=variant, channel_slug=None)
-        return ProductMediaCreate(product=product, media=media, variant=variant)
+        return ProductMediaCreate(
+            product=product,
+            media=media,
+            media_list=created_media or None,
+            variant=variant,
+        )
@@ -5,6 +5,9 @@ from unittest.mock import patch
 import graphene
 import pytest
 
+from .....graphql.product.mutations.product.product_media_create import (
+    MEDIA_URLS_LIMIT,
+)
 from .....graphql.tests.utils import get_graphql_content, get_multipart_request_body
 from .....product import ProductMediaTypes
 from .....product.error_codes import ProductErrorCode
@@ -292,3 +295,133 @@ def test_product_media_create_mutation_alt_character_limit(
     errors = content["data"]["productMediaCreate"]["errors"]
     assert errors[0]["field"] == "input"
     assert errors[0]["code"] == ProductErrorCode.INVALID.name
+
+
+def test_product_media_create_mutation_too_many_media_urls(
+    staff_api_client, product, permission_manage_products
+):
+    # given
+    query = """
+    mutation createProductMedia(
+        $product: ID!,
+        $mediaUrls: [BaseURLMediaObjectInput!]
+    ) {
+        productMediaCreate(input: {
+            product: $product,
+            mediaUrls: $mediaUrls
+        }) {
+            errors {
+                code
+                field
+            }
+        }
+    }
+    """
+    staff_api_client.user.user_permissions.add(permission_manage_products)
+    variables = {
+        "product": graphene.Node.to_global_id("Product", product.id),
+        "mediaUrls": [
+            {"url": f"https://example.com/image-{i}.jpg"}
+            for i in range(MEDIA_URLS_LIMIT + 1)
+        ],
+    }
+
+    # when
+    response = staff_api_client.post_graphql(query, variables)
+    content = get_graphql_content(response)
+
+    # then
+    errors = content["data"]["productMediaCreate"]["errors"]
+    assert errors[0]["field"] == "mediaUrls"
+    assert errors[0]["code"] == ProductErrorCode.INVALID.name
+    product.refresh_from_db()
+    assert product.media.count() == 0
+
+
+@patch("saleor.plugins.manager.PluginsManager.product_media_created")
+@patch("saleor.plugins.manager.PluginsManager.product_updated")
+@patch("saleor.graphql.product.utils.run_download_files")
+def test_product_media_create_mutation_with_media_urls(
+    mocked_run_download_files,
+    product_updated_mock,
+    product_media_created_mock,
+    staff_api_client,
+    product,
+    variant,
+    permission_manage_products,
+    media_root,
+    tmp_path,
+    django_capture_on_commit_callbacks,
+):
+    # given
+    query = """
+    mutation createProductMedia(
+        $product: ID!,
+        $variant: ID,
+        $mediaUrls: [BaseURLMediaObjectInput!]
+    ) {
+        productMediaCreate(input: {
+            product: $product,
+            variant: $variant,
+            mediaUrls: $mediaUrls
+        }) {
+            media {
+                id
+                alt
+            }
+            mediaList {
+                id
+                alt
+            }
+            errors {
+                code
+                field
+            }
+        }
+    }
+    """
+    staff_api_client.user.user_permissions.add(permission_manage_products)
+    urls = ["http://example.com/first.jpg", "http://example.com/second.jpg"]
+    downloaded_files = []
+    for i, url in enumerate(urls):
+        file_path = tmp_path / f"download-{i}.jpg"
+        file_path.write_bytes(b"image bytes")
+        downloaded_files.append((str(file_path), url))
+    mocked_run_download_files.return_value = downloaded_files
+
+    variables = {
+        "product": graphene.Node.to_global_id("Product", product.id),
+        "variant": graphene.Node.to_global_id("ProductVariant", variant.id),
+        "mediaUrls": [
+            {"url": urls[0], "alt": "first"},
+            {"url": urls[1], "alt": "second"},
+        ],
+    }
+
+    # when
+    with django_capture_on_commit_callbacks(execute=True):
+        response = staff_api_client.post_graphql(query, variables)
+    content = get_graphql_content(response)
+
+    # then
+    data = content["data"]["productMediaCreate"]
+    assert not data["errors"]
+    mocked_run_download_files.assert_called_once_with(urls)
+
+    product.refresh_from_db()
+    created_media = list(product.media.order_by("pk"))
+    assert len(created_media) == 2
+    assert [media.alt for media in created_media] == ["first", "second"]
+    assert [item["alt"] for item in data["mediaList"]] == ["first", "second"]
+    assert data["media"]["id"] == data["mediaList"][-1]["id"]
+
+    assert variant.media.count() == 2
+    assert set(variant.media.values_list("pk", flat=True)) == {
+        media.pk for media in created_media
+    }
+
+    product_updated_mock.assert_called_once_with(product)
+    assert product_media_created_mock.call_count == 2
+    assert [call.args[0] for call in product_media_created_mock.call_args_list] == (
+        created_media
+    )
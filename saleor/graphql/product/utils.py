@@ -1,13 +1,15 @@
+import asyncio
+import os
+import tempfile
+import threading
 from collections import defaultdict
 from collections.abc import Iterable
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import TYPE_CHECKING, NamedTuple, Optional
 from uuid import UUID
 
 import graphene
-import os
-import asyncio
-import aiohttp
-
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import DatabaseError, transaction
 from django.db.utils import IntegrityError
@@ -182,21 +184,185 @@ def check_for_sorting_by_rank(info, kwargs: dict):
         )
 
 
-async def fetch_file(session, url):
-    """Asynchronously downloads a file and returns its content."""
+# The download loop lives in its own daemon thread and is shared by all
+# mutations, together with one pooled client session, so DNS lookups and
+# TLS handshakes to the media hosts amortize across requests.
+DOWNLOAD_RESULT_TIMEOUT = 60
+
+_download_loop = None
+_download_loop_lock = threading.Lock()
+_download_session = None
+
+
+def _get_download_loop():
+    """Return the shared event loop, starting its thread on first use."""
+    global _download_loop
+    with _download_loop_lock:
+        if _download_loop is None:
+            _download_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_download_loop.run_forever,
+                name="product-media-downloads",
+                daemon=True,
+            ).start()
+    return _download_loop
+
+
+async def _get_download_session():
+    """Return the shared client session bound to the download loop."""
+    # Deferred so workers that never serve media_urls don't pay the
+    # aiohttp import cost (RSS per pre-forked worker).
+    import aiohttp
+
+    global _download_session
+    if _download_session is None or _download_session.closed:
+        _download_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=64, limit_per_host=8, ttl_dns_cache=300
+            )
+        )
+    return _download_session
+
+
+DOWNLOAD_CHUNK_SIZE = 128 * 1024
+# Caps applied per download batch so a request with many (or huge) URLs
+# cannot open unbounded sockets or fill the disk.
+DOWNLOAD_CONCURRENCY = getattr(
+    settings, "PRODUCT_MEDIA_DOWNLOAD_CONCURRENCY", 8
+)
+MEDIA_MAX_BYTES = getattr(
+    settings, "PRODUCT_MEDIA_MAX_DOWNLOAD_BYTES", 25 * 1024 * 1024
+)
+
+
+async def fetch_file(session, url, semaphore):
+    """Asynchronously download a file to disk and return its temp path.
+
+    Streaming to a temp file keeps one chunk per download in memory
+    instead of the whole payload; callers unlink the path when done.
+    """
+    tmp_file = None
     try:
-        async with session.get(url, timeout=10) as response:
-            response.raise_for_status()
-            content = await response.read()
-            # filename = os.path.basename(url.split("?")[0])
-            return content, url
+        async with semaphore:
+            async with session.get(url, timeout=10) as response:
+                response.raise_for_status()
+                content_length = response.headers.get("Content-Length")
+                if content_length and int(content_length) > MEDIA_MAX_BYTES:
+                    raise ValueError(
+                        f"declared size exceeds {MEDIA_MAX_BYTES} bytes"
+                    )
+                bytes_written = 0
+                with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
+                    async for chunk in response.content.iter_chunked(
+                        DOWNLOAD_CHUNK_SIZE
+                    ):
+                        # Chunked responses carry no Content-Length, so
+                        # the cap is also enforced on the actual bytes.
+                        bytes_written += len(chunk)
+                        if bytes_written > MEDIA_MAX_BYTES:
+                            raise ValueError(
+                                f"body exceeds {MEDIA_MAX_BYTES} bytes"
+                            )
+                        tmp_file.write(chunk)
+                return tmp_file.name, url
+    except asyncio.CancelledError:
+        # A timed-out caller cancels the batch; drop the partial file
+        # before propagating, nobody will ever unlink it otherwise.
+        if tmp_file is not None and os.path.exists(tmp_file.name):
+            os.unlink(tmp_file.name)
+        raise
     except Exception as e:
-        print(f"Failed to download {url}: {e}")
+        if tmp_file is not None and os.path.exists(tmp_file.name):
+            os.unlink(tmp_file.name)
+        logger.warning("Failed to download %s: %s", url, e)
         return None, None
 
 
+async def _head_allows_download(session, url, semaphore):
+    """Check via HEAD that a URL looks like a downloadable image.
+
+    Errors pass the check — servers that mishandle HEAD must not block
+    the download, and the GET enforces the same size limit anyway.
+    """
+    try:
+        async with semaphore:
+            # Redirects are followed just like the GET below follows
+            # them, so a 302 to a valid image passes the check instead
+            # of being silently filtered out.
+            async with session.head(url, timeout=10) as response:
+                content_type = response.headers.get("Content-Type", "")
+                content_length = response.headers.get("Content-Length")
+                if response.status >= 400 or not content_type.startswith(
+                    "image/"
+                ):
+                    logger.warning(
+                        "Skipping %s: status %s, content type %r",
+                        url,
+                        response.status,
+                        content_type,
+                    )
+                    return False
+                if content_length and int(content_length) > MEDIA_MAX_BYTES:
+                    logger.warning(
+                        "Skipping %s: declared size exceeds %s bytes",
+                        url,
+                        MEDIA_MAX_BYTES,
+                    )
+                    return False
+                return True
+    except Exception:
+        return True
+
+
 async def download_files(file_urls):
-    """Downloads files concurrently."""
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_file(session, url) for url in file_urls]
-        return await asyncio.gather(*tasks)
+    """Downloads files concurrently, at most DOWNLOAD_CONCURRENCY at once.
+
+    A concurrent HEAD pass first drops URLs that are clearly not images
+    (or too large) so no body bytes are transferred for them. The result
+    keeps one `(path, url)` pair per input URL, `(None, None)` for any
+    URL that was filtered out or failed.
+    """
+    session = await _get_download_session()
+    semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    checks = await asyncio.gather(
+        *(_head_allows_download(session, url, semaphore) for url in file_urls)
+    )
+    results = iter(
+        await asyncio.gather(
+            *(
+                fetch_file(session, url, semaphore)
+                for url, allowed in zip(file_urls, checks)
+                if allowed
+            )
+        )
+    )
+    return [next(results) if allowed else (None, None) for allowed in checks]
+
+
+def run_download_files(file_urls):
+    """Download files on the shared loop from synchronous code.
+
+    The deadline scales with the batch size: each URL may spend up to
+    two 10 s requests (HEAD and GET), divided across the concurrency
+    slots. On timeout the batch is cancelled — which unlinks any partial
+    temp files — and the caller gets a ValidationError instead of a bare
+    TimeoutError.
+    """
+    timeout = DOWNLOAD_RESULT_TIMEOUT + 20 * (
+        -(-len(file_urls) // DOWNLOAD_CONCURRENCY)
+    )
+    future = asyncio.run_coroutine_threadsafe(
+        download_files(file_urls), _get_download_loop()
+    )
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError as e:
+        future.cancel()
+        raise ValidationError(
+            {
+                "media_urls": ValidationError(
+                    "Downloading the media took too long.",
+                    code=ProductErrorCode.INVALID.value,
+                )
+            }
+        ) from e
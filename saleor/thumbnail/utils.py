@@ -1,7 +1,9 @@
 import os
 import secrets
+from functools import lru_cache
 from io import BytesIO
 from typing import TYPE_CHECKING, Optional, Union
+from urllib.parse import urlsplit
 
 import graphene
 import magic
@@ -254,10 +256,21 @@ class ProcessedIconImage(ProcessedImage):
     LOSSLESS_WEBP = True
 
 
+@lru_cache(maxsize=4096)
+def _split_url_filename(url: str) -> tuple[str, str]:
+    """Split a URL into a truncated base name and extension.
+
+    Cached because batch imports resolve the same CDN URLs repeatedly;
+    only this deterministic part may be cached, the random suffix in
+    `get_filename_from_url` must stay unique per call.
+    """
+    file_name = urlsplit(url).path.rsplit("/", 1)[-1]
+    name, format = os.path.splitext(file_name)
+    return name[:FILE_NAME_MAX_LENGTH], format
+
+
 def get_filename_from_url(url: str) -> str:
     """Prepare a unique filename for file from the URL to avoid overwriting."""
-    file_name = os.path.basename(url)
-    name, format = os.path.splitext((file_name.split('?') or [''])[0])
-    name = name[:FILE_NAME_MAX_LENGTH]
+    name, format = _split_url_filename(url)
     hash = secrets.token_hex(nbytes=4)
     return f"{name}_{hash}{format[:6]}"